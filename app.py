@@ -1,10 +1,16 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
+from flask import Flask, Request, render_template, request, redirect, url_for, flash, jsonify, session
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSessionInterface
+import orjson
 import os
+import tempfile
 from werkzeug.utils import secure_filename
 import logging
 import random
-import string
+import secrets
 import time
+import numpy as np
+import models
 from quiz_generator import generate_quiz
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -13,13 +19,41 @@ from werkzeug.security import generate_password_hash, check_password_hash
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class UploadRequest(Request):
+	"""Request that spools uploaded files straight to disk"""
+	def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+		# Skip the default in-memory spool and write parts into the upload folder
+		return tempfile.TemporaryFile('wb+', dir=app.config['UPLOAD_FOLDER'])
+
+class OrjsonSessionSerializer(TaggedJSONSerializer):
+	"""Tagged session serializer that encodes and decodes with orjson"""
+	def dumps(self, value):
+		return orjson.dumps(self.tag(value), option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+	
+	def loads(self, value):
+		return self._untag_scan(orjson.loads(value))
+	
+	def _untag_scan(self, value):
+		# orjson has no object_hook, so untag nested dicts bottom-up by hand
+		if isinstance(value, dict):
+			return self.untag({k: self._untag_scan(v) for k, v in value.items()})
+		if isinstance(value, list):
+			return [self._untag_scan(item) for item in value]
+		return value
+
+class OrjsonSessionInterface(SecureCookieSessionInterface):
+	serializer = OrjsonSessionSerializer()
+
 app = Flask(__name__, template_folder='Templates')
+app.request_class = UploadRequest
+app.session_interface = OrjsonSessionInterface()
 app.secret_key = 'aica2'
 app.debug = True
 
 # Configure upload settings
 UPLOAD_FOLDER = os.path.join(os.getcwd(), 'uploads')
 ALLOWED_EXTENSIONS = {'pdf', 'docx', 'pptx', 'doc', 'ppt'}
+UPLOAD_BUFFER_SIZE = 1024 * 1024  # 1 MiB chunks when copying uploads
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
@@ -27,9 +61,9 @@ app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 if not os.path.exists(UPLOAD_FOLDER):
 	os.makedirs(UPLOAD_FOLDER)
 
-# Store generated quizzes and users (in a real app, this would be in a database)
-quizzes = {}
-users = {}
+# Users, quizzes and quiz attempts are stored in SQLite
+DATABASE = os.path.join(os.getcwd(), 'quizgenie.db')
+models.init_db(DATABASE)
 
 def allowed_file(filename):
 	return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -37,8 +71,9 @@ def allowed_file(filename):
 def generate_quiz_code():
 	"""Generate a unique 8-character quiz code"""
 	while True:
-		code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-		if code not in quizzes:
+		# 48 random bits from the OS CSPRNG make a collision practically impossible
+		code = secrets.token_urlsafe(6).upper().replace('_', 'A').replace('-', 'B')[:8]
+		if not models.quiz_exists(code):
 			return code
 
 def generate_sample_questions(file_content, num_questions=5):
@@ -90,15 +125,10 @@ def register():
 		password = request.form.get('password')
 		email = request.form.get('email')
 		
-		if username in users:
+		if not models.create_user(username, generate_password_hash(password), email):
 			flash('Username already exists', 'error')
 			return redirect(url_for('register'))
 		
-		users[username] = {
-			'password': generate_password_hash(password),
-			'email': email
-		}
-		
 		flash('Registration successful! Please login.', 'success')
 		return redirect(url_for('teacher_login'))
 	
@@ -110,7 +140,8 @@ def teacher_login():
 		username = request.form.get('username')
 		password = request.form.get('password')
 		
-		if username in users and check_password_hash(users[username]['password'], password):
+		user = models.get_user(username)
+		if user and check_password_hash(user['password'], password):
 			session['teacher_logged_in'] = True
 			session['teacher_username'] = username
 			return redirect(url_for('teacher_dashboard'))
@@ -153,7 +184,7 @@ def teacher_upload():
 				
 				filename = secure_filename(f"{quiz_code}_{file.filename}")
 				filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-				file.save(filepath)
+				file.save(filepath, buffer_size=UPLOAD_BUFFER_SIZE)
 				
 				questions = generate_quiz(filepath, num_questions, quiz_type)
 				
@@ -162,14 +193,8 @@ def teacher_upload():
 					flash('Could not generate questions from the document')
 					return redirect(request.url)
 				
-				quizzes[quiz_code] = {
-					'questions': questions,
-					'filename': filename,
-					'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
-					'teacher': session.get('teacher_username'),
-					'num_questions': len(questions),
-					'quiz_type': quiz_type
-				}
+				models.create_quiz(quiz_code, questions, filename,
+								   session.get('teacher_username'), quiz_type)
 				
 				return redirect(url_for('quiz_preview', quiz_code=quiz_code))
 				
@@ -224,7 +249,7 @@ def student_dashboard():
 def take_quiz():
 	if request.method == 'POST':
 		quiz_code = request.form.get('quiz_code', '').strip().upper()
-		if quiz_code in quizzes:
+		if models.quiz_exists(quiz_code):
 			# Store quiz code in session
 			session['current_quiz'] = quiz_code
 			return redirect(url_for('attempt_quiz', quiz_code=quiz_code))
@@ -236,7 +261,8 @@ def take_quiz():
 @app.route('/attempt-quiz/<quiz_code>')
 def attempt_quiz(quiz_code):
 	# Check if quiz exists
-	if quiz_code not in quizzes:
+	quiz_data = models.get_quiz(quiz_code)
+	if quiz_data is None:
 		flash('Quiz not found')
 		return redirect(url_for('student_dashboard'))
 	
@@ -245,29 +271,52 @@ def attempt_quiz(quiz_code):
 		flash('Please enter the quiz code first')
 		return redirect(url_for('student_dashboard'))
 	
-	quiz_data = quizzes[quiz_code]
-	
-	# Create a copy of questions without correct answers for students
-	student_questions = []
-	for q in quiz_data['questions']:
-		student_q = q.copy()
-		if 'correct' in student_q:
-			del student_q['correct']
-		if 'correct_answer' in student_q:
-			del student_q['correct_answer']
-		student_questions.append(student_q)
-	
+	# Questions without correct answers are prepared once per quiz
 	return render_template('attempt_quiz.html',
 						 quiz_code=quiz_code,
-						 questions=student_questions)
+						 questions=quiz_data['student_questions'])
+
+def _score_mcq(question, submitted, matched):
+	"""Result for an MCQ answer, already matched against the answer key"""
+	return matched, {
+		'question': question['question'],
+		'submitted': question['options'][int(submitted)] if submitted else None,
+		'correct': question['options'][question['correct']],
+		'is_correct': matched
+	}
+
+def _score_tf(question, submitted, matched):
+	"""Result for a True/False answer, already matched against the answer key"""
+	return matched, {
+		'question': question['question'],
+		'submitted': 'True' if submitted == '0' else 'False',
+		'correct': 'True' if question['correct'] == 0 else 'False',
+		'is_correct': matched
+	}
+
+def _score_fb(question, submitted, matched):
+	"""Result for a fill in the blanks answer, compared case-insensitively"""
+	is_correct = bool(submitted) and submitted.lower().strip() == question['_correct_lower']
+	return is_correct, {
+		'question': question['question'],
+		'submitted': submitted,
+		'correct': question['options'][0],
+		'is_correct': is_correct
+	}
+
+_SCORERS = {
+	'mcq': _score_mcq,
+	'true_false': _score_tf,
+	'fill_blanks': _score_fb
+}
 
 @app.route('/submit-quiz/<quiz_code>', methods=['POST'])
 def submit_quiz(quiz_code):
-	if quiz_code not in quizzes:
+	quiz_data = models.get_quiz(quiz_code)
+	if quiz_data is None:
 		flash('Quiz not found')
 		return redirect(url_for('student_dashboard'))
 	
-	quiz_data = quizzes[quiz_code]
 	questions = quiz_data['questions']
 	student_name = request.form.get('student_name', '').strip()
 	
@@ -276,52 +325,30 @@ def submit_quiz(quiz_code):
 		return redirect(url_for('attempt_quiz', quiz_code=quiz_code))
 	
 	# Process answers and calculate score
-	score = 0
 	total_questions = len(questions)
 	answers = []
 	
+	# Compare MCQ and True/False answers in one vectorized pass. Parsed into int64 so
+	# out-of-range indices can't wrap around onto a valid answer
+	_get = request.form.get
+	choice_indices = quiz_data['choice_indices']
+	submitted_np = np.fromiter(
+		(int(_get(f'answer_{i}') or -1) for i in choice_indices),
+		dtype=np.int64, count=len(choice_indices))
+	matches = submitted_np == quiz_data['correct_np']
+	choice_correct = dict(zip(choice_indices, matches.tolist())).get
+	
+	score = 0
+	scorers = _SCORERS
+	append = answers.append
 	for i, question in enumerate(questions):
-		submitted = request.form.get(f'answer_{i}')
-		
-		if question['type'] == 'mcq':
-			# For MCQ, compare the selected option index
-			correct = question['correct']
-			is_correct = submitted and int(submitted) == correct
-			if is_correct:
-				score += 1
-			answers.append({
-				'question': question['question'],
-				'submitted': question['options'][int(submitted)] if submitted else None,
-				'correct': question['options'][correct],
-				'is_correct': is_correct
-			})
-		elif question['type'] == 'true_false':
-			# For True/False, compare the boolean value
-			correct = question['correct']
-			is_correct = submitted and int(submitted) == correct
-			if is_correct:
-				score += 1
-			answers.append({
-				'question': question['question'],
-				'submitted': 'True' if submitted == '0' else 'False',
-				'correct': 'True' if correct == 0 else 'False',
-				'is_correct': is_correct
-			})
-		elif question['type'] == 'fill_blanks':
-			# For fill in the blanks, do case-insensitive comparison
-			correct = question['options'][0]
-			is_correct = submitted and submitted.lower().strip() == correct.lower().strip()
-			if is_correct:
-				score += 1
-			answers.append({
-				'question': question['question'],
-				'submitted': submitted,
-				'correct': correct,
-				'is_correct': is_correct
-			})
+		is_correct, record = scorers[question['type']](question, _get(f'answer_{i}'), choice_correct(i))
+		score += is_correct
+		append(record)
 	
 	# Calculate percentage
 	percentage = (score / total_questions) * 100 if total_questions > 0 else 0
+	models.record_attempt(quiz_code, score, total_questions, percentage)
 	
 	# Store results in session
 	session['last_quiz_results'] = {
@@ -380,11 +407,11 @@ def quiz_review(quiz_id):
 
 @app.route('/quiz-preview/<quiz_code>')
 def quiz_preview(quiz_code):
-	if quiz_code not in quizzes:
+	quiz_data = models.get_quiz(quiz_code)
+	if quiz_data is None:
 		flash('Quiz not found')
 		return redirect(url_for('teacher_upload'))
 	
-	quiz_data = quizzes[quiz_code]
 	return render_template('quiz_preview.html', 
 						 quiz_code=quiz_code,
 						 questions=quiz_data['questions'])
@@ -393,7 +420,7 @@ def quiz_preview(quiz_code):
 def enter_quiz_code():
 	if request.method == 'POST':
 		quiz_code = request.form.get('quiz_code', '').strip().upper()
-		if quiz_code in quizzes:
+		if models.quiz_exists(quiz_code):
 			return redirect(url_for('take_quiz', quiz_code=quiz_code))
 		else:
 			flash('Invalid quiz code. Please try again.')
@@ -419,50 +446,8 @@ def teacher_results():
 		flash('Please login first.', 'error')
 		return redirect(url_for('teacher_login'))
 	
-	# Get all quizzes and their results
-	quiz_results = []
-	for quiz_code, quiz_data in quizzes.items():
-		# Get quiz statistics
-		total_attempts = 0
-		total_score = 0
-		scores_distribution = {
-			'90-100': 0,
-			'80-89': 0,
-			'70-79': 0,
-			'60-69': 0,
-			'Below 60': 0
-		}
-		
-		# Get results from session history
-		for result in session.get('quiz_history', []):
-			if result['code'] == quiz_code:
-				total_attempts += 1
-				total_score += result['score']
-				
-				# Update score distribution
-				percentage = result['percentage']
-				if percentage >= 90:
-					scores_distribution['90-100'] += 1
-				elif percentage >= 80:
-					scores_distribution['80-89'] += 1
-				elif percentage >= 70:
-					scores_distribution['70-79'] += 1
-				elif percentage >= 60:
-					scores_distribution['60-69'] += 1
-				else:
-					scores_distribution['Below 60'] += 1
-		
-		# Calculate average score
-		avg_score = total_score / total_attempts if total_attempts > 0 else 0
-		
-		quiz_results.append({
-			'code': quiz_code,
-			'total_attempts': total_attempts,
-			'average_score': avg_score,
-			'scores_distribution': scores_distribution,
-			'created_at': quiz_data.get('created_at', 'N/A'),
-			'question_count': len(quiz_data['questions'])
-		})
+	# Get all quizzes and their attempt statistics
+	quiz_results = models.get_quiz_results()
 	
 	return render_template('teacher_results.html',
 						 username=session.get('teacher_username'),
@@ -1,15 +1,30 @@
 # bert_model.py
 
-from transformers import BertTokenizer, BertForSequenceClassification
+import functools
+
+from transformers import BertTokenizerFast, BertForSequenceClassification
 import torch
 
-# Load pre-trained model and tokenizer
-tokenizer = BertTokenizer.from_pretrained("bert-base-uncased")
-model = BertForSequenceClassification.from_pretrained("bert-base-uncased", num_labels=2)
+DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+
+# Pre-trained model and tokenizer are loaded on first use and shared afterwards
+@functools.lru_cache(maxsize=1)
+def get_tokenizer():
+    return BertTokenizerFast.from_pretrained("bert-base-uncased")
+
+@functools.lru_cache(maxsize=1)
+def get_model():
+    model = BertForSequenceClassification.from_pretrained("bert-base-uncased", num_labels=2)
+    if DEVICE == "cuda":
+        model = model.to(DEVICE).half()
+    model.eval()
+    return model
 
 def predict_question_type(question):
-    inputs = tokenizer(question, return_tensors="pt", truncation=True, padding=True, max_length=512)
-    outputs = model(**inputs)
+    inputs = get_tokenizer()(question, return_tensors="pt", truncation=True, padding=True, max_length=512)
+    inputs = {k: v.to(DEVICE) for k, v in inputs.items()}
+    with torch.inference_mode():
+        outputs = get_model()(**inputs)
     probs = torch.nn.functional.softmax(outputs.logits, dim=1)
     prediction = torch.argmax(probs).item()
     
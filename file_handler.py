@@ -1,3 +1,4 @@
+import io
 import os
 import tempfile
 from typing import Optional
@@ -9,6 +10,18 @@ import re
 
 ALLOWED_EXTENSIONS = {'pdf', 'pptx', 'docx', 'txt'}
 MAX_FILE_SIZE = 16 * 1024 * 1024  # 16MB
+COPY_BUFFER_SIZE = 256 * 1024  # 256KB chunks when saving uploads
+
+# Without the preserve flags MuPDF expands ligatures (e.g. U+FB01) and normalizes whitespace itself
+_PDF_TEXT_FLAGS = fitz.TEXT_MEDIABOX_CLIP
+
+_RE_WS = re.compile(r'\s+')
+_RE_PUNCT = re.compile(r'[^\w\s.,!?-]')
+# Same filter as _RE_PUNCT for ASCII text, applied by str.translate in one C pass
+_ASCII_DROP = str.maketrans('', '', ''.join(
+    chr(c) for c in range(128)
+    if not (chr(c).isalnum() or chr(c).isspace() or chr(c) in '_.,!?-')
+))
 
 class FileProcessingError(Exception):
     """Custom exception for file processing errors"""
@@ -31,9 +44,14 @@ def extract_text_from_pdf(file_path: str) -> str:
     text = ""
     try:
         doc = fitz.open(file_path)
-        for page in doc:
-            text += page.get_text() + "\n"
-        doc.close()
+        try:
+            parts = []
+            for page in doc:
+                textpage = page.get_textpage(flags=_PDF_TEXT_FLAGS)
+                parts.append(textpage.extractText())
+            text = "\n".join(parts)
+        finally:
+            doc.close()
         
         if not text.strip():
             raise FileProcessingError("No readable text found in PDF file")
@@ -46,10 +64,8 @@ def extract_text_from_pptx(file_path: str) -> str:
     text = ""
     try:
         prs = Presentation(file_path)
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if hasattr(shape, "text"):
-                    text += shape.text + "\n"
+        text = "\n".join(shape.text for slide in prs.slides
+                         for shape in slide.shapes if hasattr(shape, "text"))
         if not text.strip():
             raise FileProcessingError("No readable text found in PowerPoint file")
     except Exception as e:
@@ -61,9 +77,7 @@ def extract_text_from_docx(file_path: str) -> str:
     text = ""
     try:
         doc = docx.Document(file_path)
-        for paragraph in doc.paragraphs:
-            if paragraph.text:
-                text += paragraph.text + "\n"
+        text = "\n".join(paragraph.text for paragraph in doc.paragraphs if paragraph.text)
         if not text.strip():
             raise FileProcessingError("No readable text found in Word document")
     except Exception as e:
@@ -92,11 +106,69 @@ def extract_text_from_txt(file_path: str) -> str:
 
 def clean_text(text: str) -> str:
     """Clean the extracted text"""
-    # Remove extra whitespace and newlines
-    text = re.sub(r'\s+', ' ', text)
     # Remove special characters but keep basic punctuation
-    text = re.sub(r'[^\w\s.,!?-]', '', text)
-    return text.strip()
+    if text.isascii():
+        text = text.translate(_ASCII_DROP)
+    else:
+        text = _RE_PUNCT.sub('', text)
+    # Remove extra whitespace and newlines
+    return _RE_WS.sub(' ', text).strip()
+
+def _write_upload(file, fd: int, size: int) -> None:
+    """Copy the uploaded file into an open file descriptor"""
+    # Reserve the extents up front so the copy does not fragment the file
+    if size and hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(fd, 0, size)
+        except OSError:
+            pass  # Not supported by every filesystem
+    
+    stream = file.stream
+    src_fd = None
+    # fileno() on a spool still held in memory would first roll it over to another disk file
+    if not (isinstance(stream, tempfile.SpooledTemporaryFile) and not stream._rolled):
+        try:
+            src_fd = stream.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            src_fd = None
+    
+    offset = 0
+    if src_fd is not None and hasattr(os, 'sendfile'):
+        # Spooled to a real file, let the kernel copy it
+        try:
+            while offset < size:
+                sent = os.sendfile(fd, src_fd, offset, size - offset)
+                if not sent:
+                    break
+                offset += sent
+        except OSError:
+            # Some platforms only send to sockets, copy the rest below
+            os.lseek(fd, offset, os.SEEK_SET)
+    
+    # In-memory upload or no usable sendfile, copy it through one reused buffer
+    if offset < size:
+        buffer = bytearray(COPY_BUFFER_SIZE)
+        view = memoryview(buffer)
+        # SpooledTemporaryFile only gained readinto in Python 3.11
+        readinto = getattr(stream, 'readinto', None)
+        stream.seek(offset)
+        while offset < size:
+            if readinto is not None:
+                n = readinto(buffer)
+                data = view
+            else:
+                data = stream.read(COPY_BUFFER_SIZE)
+                n = len(data)
+            if not n:
+                break
+            written = 0
+            while written < n:
+                written += os.write(fd, data[written:n])
+            offset += n
+    
+    # The file was preallocated to size, a short copy would leave a zero-filled tail
+    if offset < size:
+        raise FileProcessingError(f"Upload truncated: copied {offset} of {size} bytes")
 
 def process_uploaded_file(file, upload_folder: str) -> str:
     """Process the uploaded file and extract text
@@ -134,27 +206,30 @@ def process_uploaded_file(file, upload_folder: str) -> str:
     
     # Create a temporary file to store the upload
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{extension}') as temp_file:
-            file.save(temp_file.name)
-            
+        fd, temp_path = tempfile.mkstemp(suffix=f'.{extension}')
+        try:
             try:
-                if extension == 'pdf':
-                    text = extract_text_from_pdf(temp_file.name)
-                elif extension == 'pptx':
-                    text = extract_text_from_pptx(temp_file.name)
-                elif extension == 'docx':
-                    text = extract_text_from_docx(temp_file.name)
-                elif extension == 'txt':
-                    text = extract_text_from_txt(temp_file.name)
-                else:
-                    raise FileProcessingError("Unsupported file type")
-                    
+                _write_upload(file, fd, size)
             finally:
-                # Clean up the temporary file
-                try:
-                    os.unlink(temp_file.name)
-                except Exception:
-                    pass  # Ignore cleanup errors
+                os.close(fd)
+            
+            if extension == 'pdf':
+                text = extract_text_from_pdf(temp_path)
+            elif extension == 'pptx':
+                text = extract_text_from_pptx(temp_path)
+            elif extension == 'docx':
+                text = extract_text_from_docx(temp_path)
+            elif extension == 'txt':
+                text = extract_text_from_txt(temp_path)
+            else:
+                raise FileProcessingError("Unsupported file type")
+                
+        finally:
+            # Clean up the temporary file
+            try:
+                os.unlink(temp_path)
+            except Exception:
+                pass  # Ignore cleanup errors
                 
     except Exception as e:
         raise FileProcessingError(f"Error saving or processing file: {str(e)}")
@@ -0,0 +1,41 @@
+# hf_pipelines.py
+
+import contextlib
+import functools
+import threading
+
+import torch
+from transformers import pipeline
+
+def pipeline_kwargs():
+    """Run on the first GPU in half precision when CUDA is available"""
+    if torch.cuda.is_available():
+        return {'device': 0, 'torch_dtype': torch.float16}
+    return {'device': -1}
+
+def build_pipeline(task, model, quantize=True):
+    """Load a pipeline in inference mode, quantizing its Linear layers to int8 on CPU"""
+    pipe = pipeline(task, model=model, **pipeline_kwargs())
+    pipe.model.eval()
+    if quantize and not torch.cuda.is_available():
+        # int8 weights, activations are quantized on the fly
+        pipe.model = torch.quantization.quantize_dynamic(pipe.model, {torch.nn.Linear}, dtype=torch.qint8)
+    return pipe
+
+# One copy per (task, model) in the process, loaded by whichever module asks for it first
+_get_pipeline = functools.lru_cache(maxsize=None)(build_pipeline)
+
+_locks_guard = threading.Lock()
+_pipeline_locks = {}
+
+@contextlib.contextmanager
+def using_pipeline(task, model):
+    """Check out the shared pipeline for (task, model), one thread at a time
+
+    HF pipelines and their fast tokenizers are not safe to call from two threads at once,
+    so concurrent callers wait for the copy instead of loading another one.
+    """
+    with _locks_guard:
+        lock = _pipeline_locks.setdefault((task, model), threading.Lock())
+    with lock:
+        yield _get_pipeline(task, model)
@@ -0,0 +1,209 @@
+# models.py
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from typing import Dict, List, Optional
+
+import numpy as np
+
+DATABASE = 'quizgenie.db'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password TEXT NOT NULL,
+    email TEXT
+);
+
+CREATE TABLE IF NOT EXISTS quizzes (
+    code TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    teacher TEXT,
+    quiz_type TEXT NOT NULL,
+    filename TEXT,
+    num_questions INTEGER NOT NULL,
+    questions TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS quiz_attempts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    quiz_code TEXT NOT NULL REFERENCES quizzes(code),
+    score INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    percentage REAL NOT NULL,
+    submitted_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_quiz_attempts_quiz_code ON quiz_attempts(quiz_code);
+"""
+
+_local = threading.local()
+
+# Quizzes never change once created, so the most recently used decoded rows are kept
+# per process, bounded so long-running workers don't accumulate every quiz
+_QUIZ_CACHE_SIZE = 256
+_quiz_cache = OrderedDict()
+_quiz_cache_lock = threading.Lock()
+
+def init_db(path: str) -> None:
+    """Create the tables and switch the database to WAL mode"""
+    global DATABASE
+    DATABASE = path
+    with closing(sqlite3.connect(path)) as conn:
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(_SCHEMA)
+        conn.commit()
+
+def get_connection() -> sqlite3.Connection:
+    """Get the connection for the current thread, opening it on first use"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(DATABASE, timeout=10)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA foreign_keys = ON')
+        _local.conn = conn
+    return conn
+
+def get_user(username: str) -> Optional[Dict]:
+    """Get a registered user by username"""
+    row = get_connection().execute(
+        'SELECT username, password, email FROM users WHERE username = ?', (username,)
+    ).fetchone()
+    return dict(row) if row else None
+
+def create_user(username: str, password_hash: str, email: str) -> bool:
+    """Register a user, returning False if the username is taken"""
+    conn = get_connection()
+    try:
+        with conn:
+            conn.execute(
+                'INSERT INTO users (username, password, email) VALUES (?, ?, ?)',
+                (username, password_hash, email)
+            )
+    except sqlite3.IntegrityError:
+        return False
+    return True
+
+def _cache_get(quiz_code: str) -> Optional[Dict]:
+    with _quiz_cache_lock:
+        quiz = _quiz_cache.get(quiz_code)
+        if quiz is not None:
+            _quiz_cache.move_to_end(quiz_code)
+        return quiz
+
+def _cache_put(quiz_code: str, quiz: Dict) -> None:
+    with _quiz_cache_lock:
+        _quiz_cache[quiz_code] = quiz
+        _quiz_cache.move_to_end(quiz_code)
+        if len(_quiz_cache) > _QUIZ_CACHE_SIZE:
+            _quiz_cache.popitem(last=False)
+
+def quiz_exists(quiz_code: str) -> bool:
+    """Check whether a quiz code is in use"""
+    if quiz_code in _quiz_cache:
+        return True
+    row = get_connection().execute(
+        'SELECT 1 FROM quizzes WHERE code = ?', (quiz_code,)
+    ).fetchone()
+    return row is not None
+
+def _build_quiz(code: str, questions: List[Dict], filename: str, teacher: str,
+                quiz_type: str, created_at: str) -> Dict:
+    # Answer key for the option-index questions, scored together on submit
+    choice_indices = [i for i, q in enumerate(questions) if q['type'] in ('mcq', 'true_false')]
+    for q in questions:
+        if q['type'] == 'fill_blanks':
+            q['_correct_lower'] = q['options'][0].lower().strip()
+    quiz = {
+        'questions': questions,
+        'filename': filename,
+        'created_at': created_at,
+        'teacher': teacher,
+        'num_questions': len(questions),
+        'quiz_type': quiz_type,
+        'choice_indices': choice_indices,
+        'correct_np': np.array([questions[i]['correct'] for i in choice_indices], dtype=np.int8),
+        # Questions as shown to students, without the answers
+        'student_questions': [
+            {k: v for k, v in q.items() if k not in ('correct', 'correct_answer', '_correct_lower')}
+            for q in questions
+        ]
+    }
+    _cache_put(code, quiz)
+    return quiz
+
+def create_quiz(quiz_code: str, questions: List[Dict], filename: str, teacher: str,
+                quiz_type: str) -> Dict:
+    """Store a generated quiz and return it"""
+    created_at = time.strftime('%Y-%m-%d %H:%M:%S')
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            'INSERT INTO quizzes (code, created_at, teacher, quiz_type, filename, num_questions, questions) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (quiz_code, created_at, teacher, quiz_type, filename, len(questions), json.dumps(questions))
+        )
+    return _build_quiz(quiz_code, questions, filename, teacher, quiz_type, created_at)
+
+def get_quiz(quiz_code: str) -> Optional[Dict]:
+    """Get a quiz by code"""
+    quiz = _cache_get(quiz_code)
+    if quiz is not None:
+        return quiz
+    row = get_connection().execute(
+        'SELECT code, created_at, teacher, quiz_type, filename, questions FROM quizzes WHERE code = ?',
+        (quiz_code,)
+    ).fetchone()
+    if row is None:
+        return None
+    return _build_quiz(row['code'], json.loads(row['questions']), row['filename'],
+                       row['teacher'], row['quiz_type'], row['created_at'])
+
+def record_attempt(quiz_code: str, score: int, total: int, percentage: float) -> None:
+    """Record a student's scored attempt at a quiz"""
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            'INSERT INTO quiz_attempts (quiz_code, score, total, percentage, submitted_at) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (quiz_code, score, total, percentage, time.strftime('%Y-%m-%d %H:%M:%S'))
+        )
+
+def get_quiz_results() -> List[Dict]:
+    """Get attempt statistics for every quiz, aggregated in a single query"""
+    rows = get_connection().execute("""
+        SELECT q.code, q.created_at, q.num_questions,
+               COUNT(a.id) AS total_attempts,
+               COALESCE(AVG(a.score), 0) AS average_score,
+               SUM(CASE WHEN a.percentage >= 90 THEN 1 ELSE 0 END) AS band_90,
+               SUM(CASE WHEN a.percentage >= 80 AND a.percentage < 90 THEN 1 ELSE 0 END) AS band_80,
+               SUM(CASE WHEN a.percentage >= 70 AND a.percentage < 80 THEN 1 ELSE 0 END) AS band_70,
+               SUM(CASE WHEN a.percentage >= 60 AND a.percentage < 70 THEN 1 ELSE 0 END) AS band_60,
+               SUM(CASE WHEN a.percentage < 60 THEN 1 ELSE 0 END) AS band_below
+        FROM quizzes q
+        LEFT JOIN quiz_attempts a ON a.quiz_code = q.code
+        GROUP BY q.code
+        ORDER BY q.rowid
+    """).fetchall()
+
+    return [
+        {
+            'code': row['code'],
+            'total_attempts': row['total_attempts'],
+            'average_score': row['average_score'],
+            'scores_distribution': {
+                '90-100': row['band_90'],
+                '80-89': row['band_80'],
+                '70-79': row['band_70'],
+                '60-69': row['band_60'],
+                'Below 60': row['band_below']
+            },
+            'created_at': row['created_at'] or 'N/A',
+            'question_count': row['num_questions']
+        }
+        for row in rows
+    ]
@@ -1,59 +1,86 @@
 # objective.py
 
 import re
-import nltk
+import functools
 import numpy as np
 from nltk.corpus import wordnet as wn
-from nltk.tokenize import word_tokenize, sent_tokenize
-from transformers import pipeline
+from nltk.tokenize import sent_tokenize
+from hf_pipelines import using_pipeline
+from spacy_model import get_nlp
 from nltk.corpus import stopwords
 import random
+import torch
+
+_STOP_WORDS = frozenset(stopwords.words('english'))
+wn.ensure_loaded()
+_ALNUM = re.compile(r'\w+')
+_QUESTION_PROMPT = "Generate a factual question about this text: {}"
+
+_GENERATOR_PIPELINE = ("text2text-generation", "google/flan-t5-base")
+_QA_PIPELINE = ("question-answering", "distilbert-base-cased-distilled-squad")
 
 class ObjectiveTest:
     def __init__(self, text, num_questions):
         self.text = text
         self.num_questions = num_questions
-        self.generator = pipeline("text2text-generation", model="google/flan-t5-base")
-        self.qa_pipeline = pipeline("question-answering", model="distilbert-base-cased-distilled-squad")
+        self._vocab = []
 
     def preprocess_text(self):
         """Preprocess the text to get meaningful sentences"""
         sentences = sent_tokenize(self.text)
         # Filter out short sentences and those without important content
-        stop_words = set(stopwords.words('english'))
         meaningful_sentences = []
         
         for sent in sentences:
-            words = word_tokenize(sent.lower())
+            words = _ALNUM.findall(sent.lower())
             words = [w for w in words if w.isalnum()]
             if len(words) > 8:  # Minimum sentence length
-                content_words = [w for w in words if w not in stop_words]
+                content_words = [w for w in words if w not in _STOP_WORDS]
                 if len(content_words) > 5:  # Minimum content words
                     meaningful_sentences.append(sent)
+        
+        # Distractor vocabulary for the whole document, built once in a single set comprehension
+        self._vocab = list({w for w in _ALNUM.findall(self.text.lower())
+                            if len(w) > 3 and w.isalnum() and w not in _STOP_WORDS})
                     
         return meaningful_sentences
 
-    def generate_distractors(self, answer, context):
+    def generate_distractors(self, answer):
         """Generate plausible distractors for multiple choice"""
         try:
-            # Use similar words from context
-            words = word_tokenize(context.lower())
-            words = [w for w in words if w.isalnum() and w not in stopwords.words('english')]
-            
-            # Get unique words that are different from the answer
-            distractors = list(set([w.capitalize() for w in words 
-                                  if w not in answer.lower() 
-                                  and len(w) > 3]))
+            # Use document words that are different from the answer
+            answer_lower = answer.lower()
+            distractors = [w for w in self._vocab if w not in answer_lower]
             
             # Select random distractors
             if len(distractors) >= 3:
-                return random.sample(distractors, 3)
+                return [w.capitalize() for w in random.sample(distractors, 3)]
             else:
                 # If not enough distractors, generate some basic ones
                 return [f"Not {answer}", f"None of the above", f"All of the above"]
         except Exception:
             return [f"Not {answer}", f"None of the above", f"All of the above"]
 
+    def _generate_batch(self, contexts):
+        """Generate a question and its answer for every context in two batched passes"""
+        with torch.inference_mode():
+            # Generate all questions in one batched text2text pass
+            prompts = [_QUESTION_PROMPT.format(context) for context in contexts]
+            with using_pipeline(*_GENERATOR_PIPELINE) as generator:
+                generated = generator(prompts, max_length=50, num_return_sequences=1,
+                                      batch_size=len(prompts))
+            # Single-sequence results for a list of prompts come back flattened
+            questions = [(g[0] if isinstance(g, list) else g)['generated_text']
+                         for g in generated]
+            
+            # Get all answers in one batched question-answering pass
+            qa_inputs = [{'question': q, 'context': c} for q, c in zip(questions, contexts)]
+            with using_pipeline(*_QA_PIPELINE) as qa_pipeline:
+                qa_results = qa_pipeline(qa_inputs, batch_size=len(qa_inputs))
+            if isinstance(qa_results, dict):  # A single input is not wrapped in a list
+                qa_results = [qa_results]
+        return [(q, r['answer']) for q, r in zip(questions, qa_results)]
+
     def generate_test(self):
         """Generate multiple choice questions"""
         try:
@@ -64,20 +91,15 @@ class ObjectiveTest:
             # Select random sentences for question generation
             selected_sentences = random.sample(meaningful_sentences, self.num_questions)
             
+            # One batched pass over all sentences, on CPU as well as GPU
+            generated = self._generate_batch(selected_sentences)
+            
             questions = []
             answers = []
             
-            for context in selected_sentences:
-                # Generate question using text2text model
-                prompt = f"Generate a factual question about this text: {context}"
-                question = self.generator(prompt, max_length=50, num_return_sequences=1)[0]['generated_text']
-                
-                # Get answer using question-answering model
-                qa_result = self.qa_pipeline(question=question, context=context)
-                correct_answer = qa_result['answer']
-                
+            for question, correct_answer in generated:
                 # Generate distractors
-                distractors = self.generate_distractors(correct_answer, context)
+                distractors = self.generate_distractors(correct_answer)
                 
                 # Create multiple choice options
                 options = [correct_answer] + distractors
@@ -102,36 +124,27 @@ class ObjectiveTest:
     def get_trivial_sentences(self):
         sentences = sent_tokenize(self.text)
         trivial_sentences = []
-        for sent in sentences:
-            trivial = self.identify_trivial_sentences(sent)
+        # Tag and parse every sentence in one batched spaCy pass
+        docs = get_nlp().pipe(sentences, batch_size=64)
+        for sent, doc in zip(sentences, docs):
+            trivial = self.identify_trivial_sentences(sent, doc)
             if trivial:
                 trivial_sentences.append(trivial)
         return trivial_sentences
 
-    def identify_trivial_sentences(self, sentence):
-        tokens = word_tokenize(sentence)
+    def identify_trivial_sentences(self, sentence, doc=None):
+        if doc is None:
+            doc = get_nlp()(sentence)
+        tokens = [token.text for token in doc]
         if len(tokens) < 4:
             return None
-        tags = nltk.pos_tag(tokens)
-        if tags[0][1] == "RB":
+        if doc[0].tag_ == "RB":
             return None
 
-        grammar = r"""
-            CHUNK: {<NN>+<IN|DT>*<NN>+}
-                   {<NN>+<IN|DT>*<NNP>+}
-                   {<NNP>+<NNS>*}
-        """
-        chunker = nltk.RegexpParser(grammar)
-        tree = chunker.parse(tags)
-
-        noun_phrases = []
-        for subtree in tree.subtrees():
-            if subtree.label() == "CHUNK":
-                phrase = " ".join(word for word, tag in subtree)
-                noun_phrases.append(phrase)
+        noun_phrases = [chunk.text for chunk in doc.noun_chunks]
 
         replace_nouns = []
-        for word, _ in tags:
+        for word in tokens:
             for phrase in noun_phrases:
                 if phrase[0] == '\'':
                     break
@@ -147,7 +160,7 @@ class ObjectiveTest:
 
         trivial = {
             "Answer": " ".join(replace_nouns),
-            "Similar": self.answer_options(replace_nouns[0]) if len(replace_nouns) == 1 else []
+            "Similar": list(self.answer_options(replace_nouns[0])) if len(replace_nouns) == 1 else []
         }
 
         replace_phrase = " ".join(replace_nouns)
@@ -156,13 +169,14 @@ class ObjectiveTest:
         return trivial
 
     @staticmethod
+    @functools.lru_cache(maxsize=8192)
     def answer_options(word):
         synsets = wn.synsets(word, pos="n")
         if not synsets:
-            return []
+            return ()
         hypernyms = synsets[0].hypernyms()
         if not hypernyms:
-            return []
+            return ()
         hyponyms = hypernyms[0].hyponyms()
         similar_words = []
         for hyponym in hyponyms:
@@ -171,4 +185,4 @@ class ObjectiveTest:
                 similar_words.append(similar_word)
             if len(similar_words) >= 8:
                 break
-        return similar_words
+        return tuple(similar_words)
@@ -1,25 +1,86 @@
 import nltk
 import random
-from nltk.tokenize import sent_tokenize, word_tokenize
-from nltk.tag import pos_tag
 from nltk.corpus import stopwords
 import logging
-import PyPDF2
+import pypdfium2 as pdfium
 import docx
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import re
+from contextlib import closing
+from itertools import islice
 import time
+from text_utils import fast_sent_tokenize
+from spacy_model import get_nlp
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Loaded once when the module is imported instead of per token checked
+STOPWORDS = frozenset(stopwords.words('english'))
+
+# Generic distractors used to pad MCQ options, keyed by POS tag prefix
+GENERIC_OPTIONS = {
+    'NN': ('object', 'item', 'thing', 'element', 'part', 'system', 'component'),
+    'VB': ('make', 'take', 'give', 'find', 'show', 'create', 'perform'),
+    'JJ': ('good', 'new', 'first', 'last', 'long', 'important', 'different')
+}
+
+# Runs of letters, the candidate answers for fill in the blanks
+_WORD_RE = re.compile(r'[^\W\d_]+')
+
+# Word swaps used to turn a statement false, matched on word boundaries in one regex pass
+ANTONYMS = {
+    'good': 'bad', 'bad': 'good',
+    'high': 'low', 'low': 'high',
+    'large': 'small', 'small': 'large',
+    'fast': 'slow', 'slow': 'fast',
+    'early': 'late', 'late': 'early',
+    'hot': 'cold', 'cold': 'hot',
+    'new': 'old', 'old': 'new',
+    'right': 'wrong', 'wrong': 'right'
+}
+_ANTONYM_RE = re.compile(r'\b(' + '|'.join(map(re.escape, ANTONYMS)) + r')\b', re.IGNORECASE)
+
+# Anything that is not alphanumeric, whitespace or basic punctuation (\w also matches '_')
+_CLEAN_RE = re.compile(r'[^\w\s.,!?]|_')
+
+_TAG_CACHE = {}
+_TAG_CACHE_SIZE = 4096
+_TAG_BATCH_SIZE = 64
+
+def _tag_sentences(sentences):
+    """POS-tag sentences, streaming the ones not seen before through one spaCy pipe"""
+    result = {sentence: _TAG_CACHE.get(sentence) for sentence in sentences}
+    missing = [sentence for sentence, tagged in result.items() if tagged is None]
+    if missing:
+        # Only tokenization and tagging are needed, skip the parser
+        docs = get_nlp().pipe(missing, batch_size=_TAG_BATCH_SIZE, disable=['parser'])
+        if len(_TAG_CACHE) + len(missing) > _TAG_CACHE_SIZE:
+            _TAG_CACHE.clear()
+        for sentence, doc in zip(missing, docs):
+            # Penn Treebank tags, the same scheme NLTK's tagger produced
+            tagged = tuple((token.text, token.tag_) for token in doc)
+            result[sentence] = _TAG_CACHE[sentence] = tagged
+    return [result[sentence] for sentence in sentences]
+
+def _iter_tagged(sentences, batch_size=_TAG_BATCH_SIZE):
+    """Yield (sentence, tagged) pairs, tagging one batch of sentences at a time"""
+    sentences = iter(sentences)
+    while True:
+        batch = list(islice(sentences, batch_size))
+        if not batch:
+            return
+        yield from zip(batch, _tag_sentences(batch))
+
 def extract_text_from_pdf(file_path):
     """Extract text from PDF file"""
     try:
-        with open(file_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            text = ' '.join(page.extract_text() for page in reader.pages)
+        pdf = pdfium.PdfDocument(file_path)
+        try:
+            text = ' '.join(page.get_textpage().get_text_range() for page in pdf)
+        finally:
+            pdf.close()
         return text
     except Exception as e:
         logger.error(f"Error extracting text from PDF: {str(e)}")
@@ -46,27 +107,42 @@ def extract_text(file_path):
     else:
         raise ValueError(f"Unsupported file type: {file_extension}")
 
+def iter_sentences(file_path):
+    """Yield the sentences of a document, reading PDFs one page at a time"""
+    file_extension = os.path.splitext(file_path)[1].lower()
+    
+    if file_extension != '.pdf':
+        yield from fast_sent_tokenize(extract_text(file_path))
+        return
+    
+    try:
+        pdf = pdfium.PdfDocument(file_path)
+    except Exception as e:
+        logger.error(f"Error extracting text from PDF: {str(e)}")
+        raise
+    try:
+        for page in pdf:
+            yield from fast_sent_tokenize(page.get_textpage().get_text_range())
+    finally:
+        pdf.close()
+
 def generate_quiz(file_path, num_questions=10, quiz_type='mcq'):
     """Generate quiz questions from document"""
     try:
-        # Extract text from document
-        text = extract_text(file_path)
-        
         # Generate questions based on type
         if quiz_type == 'mcq':
             questions = []
-            sentences = sent_tokenize(text)
+            # Process only as many sentences as needed, more than needed to ensure enough good ones
+            with closing(iter_sentences(file_path)) as document:
+                sentences = list(islice(document, num_questions * 2))
             used_answers = set()  # Track used answers
             
-            # Process only as many sentences as needed
-            for sentence in sentences[:num_questions * 2]:  # Process more sentences than needed to ensure enough good ones
-                words = word_tokenize(sentence)
-                tagged = pos_tag(words)
+            for sentence, tagged in _iter_tagged(sentences):
                 
                 # Find important words that haven't been used as answers
                 important_words = [(word, tag) for word, tag in tagged 
                                  if tag.startswith(('NN', 'VB', 'JJ')) 
-                                 and word.lower() not in stopwords.words('english')
+                                 and word.lower() not in STOPWORDS
                                  and word.lower() not in used_answers
                                  and len(word) > 3]
                 
@@ -75,32 +151,24 @@ def generate_quiz(file_path, num_questions=10, quiz_type='mcq'):
                     if word_to_replace.lower() not in used_answers:  # Double check
                         question_text = f"What is the correct word in: '{sentence.replace(word_to_replace, '_____')}'"
                         
-                        # Generate exactly 4 options
+                        # Generate exactly 4 unique options, tracked in a set
                         options = [word_to_replace]  # Correct answer is always first
+                        seen = {word_to_replace}
                         
                         # Add similar words from sentence
                         similar_words = [w for w, t in tagged if t == tag and w != word_to_replace]
-                        if similar_words:
-                            options.extend(random.sample(similar_words, min(2, len(similar_words))))
+                        for similar in random.sample(similar_words, min(2, len(similar_words))):
+                            if similar not in seen:
+                                seen.add(similar)
+                                options.append(similar)
                         
                         # Add generic options until we have exactly 4
-                        generic_options = {
-                            'NN': ['object', 'item', 'thing', 'element', 'part', 'system', 'component'],
-                            'VB': ['make', 'take', 'give', 'find', 'show', 'create', 'perform'],
-                            'JJ': ['good', 'new', 'first', 'last', 'long', 'important', 'different']
-                        }
-                        
-                        tag_prefix = tag[:2]  # Get NN, VB, or JJ
+                        pool = GENERIC_OPTIONS.get(tag[:2], GENERIC_OPTIONS['NN'])  # NN, VB, or JJ
+                        choice = random.choice
                         while len(options) < 4:
-                            generic = random.choice(generic_options.get(tag_prefix, generic_options['NN']))
-                            if generic not in options:
-                                options.append(generic)
-                        
-                        # Ensure exactly 4 unique options
-                        options = list(dict.fromkeys(options))[:4]
-                        while len(options) < 4:  # In case we still don't have 4 unique options
-                            generic = random.choice(generic_options.get(tag_prefix, generic_options['NN']))
-                            if generic not in options:
+                            generic = choice(pool)
+                            if generic not in seen:
+                                seen.add(generic)
                                 options.append(generic)
                         
                         # Remember the correct answer
@@ -127,7 +195,8 @@ def generate_quiz(file_path, num_questions=10, quiz_type='mcq'):
             
         elif quiz_type == 'true_false':
             questions = []
-            sentences = sent_tokenize(text)[:num_questions]
+            with closing(iter_sentences(file_path)) as document:
+                sentences = list(islice(document, num_questions))
             
             for sentence in sentences:
                 correct = random.choice([True, False])
@@ -148,7 +217,9 @@ def generate_quiz(file_path, num_questions=10, quiz_type='mcq'):
             return questions
             
         elif quiz_type == 'fill_blanks':
-            return generate_fill_blanks(text, num_questions)
+            # Pages stop being read once enough questions are found
+            with closing(iter_sentences(file_path)) as document:
+                return generate_fill_blanks_from_sentences(document, num_questions)
             
         else:
             raise ValueError(f"Unsupported quiz type: {quiz_type}")
@@ -162,57 +233,51 @@ def clean_text(text):
     # Remove extra whitespace
     text = ' '.join(text.split())
     # Remove special characters but keep punctuation
-    text = ''.join(char for char in text if char.isalnum() or char.isspace() or char in '.,!?')
-    return text
+    return _CLEAN_RE.sub('', text)
 
 def generate_mcq_questions(text, num_questions):
     """Generate multiple choice questions with optimized processing"""
     try:
         # Tokenize text into sentences
-        sentences = sent_tokenize(text)
+        sentences = fast_sent_tokenize(text)
         
-        # Process sentences in parallel
-        with ThreadPoolExecutor() as executor:
-            # Process sentences in chunks for better performance
-            chunk_size = min(10, len(sentences))
-            sentence_chunks = [sentences[i:i + chunk_size] for i in range(0, len(sentences), chunk_size)]
-            
-            questions = []
-            used_words = set()
-            
-            for chunk in sentence_chunks:
-                if len(questions) >= num_questions:
-                    break
-                    
-                # Process chunk of sentences in parallel
-                futures = []
-                for sentence in chunk:
-                    futures.append(executor.submit(process_sentence, sentence, used_words))
-                
-                # Collect results
-                for future in as_completed(futures):
-                    result = future.result()
-                    if result and len(questions) < num_questions:
-                        questions.append(result)
-                        if result.get('correct_answer'):
-                            used_words.add(result['correct_answer'].lower())
-            
-            return questions[:num_questions]
+        questions = []
+        seen = set()
+        
+        # Sentences are tagged in batched spaCy passes, and tagging stops once enough
+        # questions are found
+        for sentence, tagged in _iter_tagged(sentences):
+            result = process_sentence(sentence, tagged)
+            if not result:
+                continue
+            # process_sentence keeps no state, so drop repeated answers here
+            question, answer_lower = result
+            if answer_lower in seen:
+                continue
+            seen.add(answer_lower)
+            questions.append(question)
+            if len(questions) >= num_questions:
+                break
+        
+        return questions
             
     except Exception as e:
         logger.error(f"Error generating MCQ questions: {str(e)}")
         raise
 
-def process_sentence(sentence, used_words):
-    """Process a single sentence to generate a question"""
-    words = word_tokenize(sentence)
-    tagged = pos_tag(words)
+def process_sentence(sentence, tagged=None):
+    """Process a single sentence to generate a question
     
-    # Find important words that haven't been used
+    Returns (question, lowercased answer), or None if the sentence has no usable
+    word. No state is shared between calls, the caller de-duplicates answers.
+    """
+    if tagged is None:
+        tagged = _tag_sentences([sentence])[0]
+    
+    # Find important words
     important_words = [(word, tag) for word, tag in tagged 
                       if tag.startswith(('NN', 'VB', 'JJ')) 
-                      and word.lower() not in stopwords.words('english')
-                      and word.lower() not in used_words
+                      and word.lower() not in STOPWORDS
                       and len(word) > 3]
     
     if important_words:
@@ -221,25 +286,29 @@ def process_sentence(sentence, used_words):
         # Generate question
         question_text = f"What is the correct word in: '{sentence.replace(word_to_replace, '_____')}'"
         
-        # Generate options quickly
+        # Generate options quickly, tracking them in a set to keep them unique
         options = [word_to_replace]  # Correct answer
+        seen = {word_to_replace}
         
         # Add similar words from the sentence first
         similar_words = [w for w, t in tagged if t == tag and w != word_to_replace]
-        if similar_words:
-            options.extend(random.sample(similar_words, min(2, len(similar_words))))
+        for similar in random.sample(similar_words, min(2, len(similar_words))):
+            if similar not in seen:
+                seen.add(similar)
+                options.append(similar)
         
         # If we need more options, add them based on word type
         while len(options) < 4:
             if tag.startswith('NN'):
-                options.append(random.choice(['object', 'item', 'thing', 'element', 'part']))
+                generic = random.choice(['object', 'item', 'thing', 'element', 'part'])
             elif tag.startswith('VB'):
-                options.append(random.choice(['make', 'take', 'give', 'find', 'show']))
+                generic = random.choice(['make', 'take', 'give', 'find', 'show'])
             elif tag.startswith('JJ'):
-                options.append(random.choice(['good', 'new', 'first', 'last', 'long']))
+                generic = random.choice(['good', 'new', 'first', 'last', 'long'])
             
-            # Remove duplicates
-            options = list(dict.fromkeys(options))
+            if generic not in seen:
+                seen.add(generic)
+                options.append(generic)
         
         # Shuffle options
         random.shuffle(options)
@@ -250,40 +319,26 @@ def process_sentence(sentence, used_words):
             'correct': options.index(word_to_replace),
             'correct_answer': word_to_replace,
             'type': 'mcq'
-        }
+        }, word_to_replace.lower()
     
     return None
 
 def generate_true_false_questions(text, num_questions):
     """Generate true/false questions"""
-    sentences = sent_tokenize(text)
+    sentences = fast_sent_tokenize(text)
     questions = []
     
     for sentence in sentences[:num_questions]:
-        words = word_tokenize(sentence)
-        tagged = pos_tag(words)
         
         # Create a false statement by modifying the sentence
         modified = sentence
         correct_answer = random.choice([True, False])
         
         if not correct_answer:
-            # Modify sentence to make it false
-            for i, (word, tag) in enumerate(tagged):
-                if tag.startswith(('JJ', 'RB', 'VB')):
-                    antonyms = {
-                        'good': 'bad', 'bad': 'good',
-                        'high': 'low', 'low': 'high',
-                        'large': 'small', 'small': 'large',
-                        'fast': 'slow', 'slow': 'fast',
-                        'early': 'late', 'late': 'early',
-                        'hot': 'cold', 'cold': 'hot',
-                        'new': 'old', 'old': 'new',
-                        'right': 'wrong', 'wrong': 'right'
-                    }
-                    if word.lower() in antonyms:
-                        modified = modified.replace(word, antonyms[word.lower()])
-                        break
+            # Modify sentence to make it false by swapping its first known word for an antonym
+            modified = _ANTONYM_RE.sub(lambda m: ANTONYMS[m.group(0).lower()], sentence, count=1)
+            # Without a swap the statement is still true
+            correct_answer = modified == sentence
         
         questions.append({
             'question': modified,
@@ -298,26 +353,25 @@ def generate_true_false_questions(text, num_questions):
 
 def generate_fill_blanks(text, num_questions):
     """Generate fill in the blanks questions"""
+    return generate_fill_blanks_from_sentences(fast_sent_tokenize(text), num_questions)
+
+def generate_fill_blanks_from_sentences(sentences, num_questions):
+    """Generate fill in the blanks questions from an iterable of sentences"""
     questions = []
-    sentences = sent_tokenize(text)
     used_answers = set()  # Track used answers to avoid duplicates
     
     for sentence in sentences:
         if len(questions) >= num_questions:
             break
             
-        words = word_tokenize(sentence)
-        tagged = pos_tag(words)
-        
-        # Find important nouns or key terms
-        important_words = [(word, i) for i, (word, tag) in enumerate(tagged) 
-                         if (tag.startswith('NN') or tag.startswith('JJ') or tag.startswith('VB'))
-                         and len(word) > 3
-                         and word.lower() not in stopwords.words('english')
+        # Find key terms, the length and stopword filters stand in for POS tagging
+        important_words = [word for word in _WORD_RE.findall(sentence)
+                         if len(word) > 3
+                         and word.lower() not in STOPWORDS
                          and word.lower() not in used_answers]  # Check if answer was already used
         
         if important_words:
-            word, _ = random.choice(important_words)
+            word = random.choice(important_words)
             # Only add if the answer is unique
             if word.lower() not in used_answers:
                 blank_sentence = sentence.replace(word, '_____', 1)
@@ -1,31 +1,25 @@
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
-import random
-import string
+import heapq
+import secrets
 import time
-import uuid
+
+# Placeholder that reserves a quiz code until the quiz itself is stored
+_SENTINEL = object()
 
 class QuizStore:
     def __init__(self):
         self.quizzes = {}
-        self.submissions = {}
         self.expired_quizzes = {}
+        self._expiry_heap = []  # (expires_at_ts, code) min-heap, soonest expiry first
         self.expiry_time = timedelta(hours=24)  # Quizzes expire after 24 hours
         self.code_prefix = "QZ"  # Prefix for quiz codes
         self._last_cleanup = time.time()
         self._cleanup_interval = 3600  # Cleanup every hour
     
     def generate_unique_code(self) -> str:
-        """Generate a unique quiz code"""
-        timestamp = int(time.time() * 1000)  # Get current timestamp in milliseconds
-        random_part = ''.join(random.choices(string.digits + string.ascii_uppercase, k=4))
-        code = f"{self.code_prefix}{random_part}{timestamp % 100:02d}"
-        
-        # In the unlikely event of a collision, append a random character
-        while code in self.quizzes:
-            code = code[:-1] + random.choice(string.ascii_uppercase)
-        
-        return code
+        """Generate a random quiz code, made unique by create_quiz"""
+        return secrets.token_hex(4).upper()
     
     def create_quiz(self, questions: List[Dict], quiz_type: str, created_by: str = "teacher") -> str:
         """Create a new quiz and return its code"""
@@ -35,26 +29,40 @@ class QuizStore:
             self.cleanup_expired_quizzes()
             self._last_cleanup = current_time
         
-        # Generate unique code
-        quiz_code = str(uuid.uuid4())[:8].upper()
+        # Lowercase the answer key once instead of on every submission. Done before
+        # a code is reserved, so a bad question can't leave the placeholder behind
+        for q in questions:
+            if 'correct_answer' in q:
+                q['_ans_lc'] = q['correct_answer'].lower()
+        
+        now = datetime.now()
+        expires_at_ts = current_time + self.expiry_time.total_seconds()
+        
+        # Generate unique code, reserving it with a single dict operation
+        while True:
+            quiz_code = self.generate_unique_code()
+            if self.quizzes.setdefault(quiz_code, _SENTINEL) is _SENTINEL:
+                break
         
         self.quizzes[quiz_code] = {
             'questions': questions,
             'type': quiz_type,
             'created_by': created_by,
             'submissions': [],
-            'created_at': datetime.now(),
-            'expires_at': datetime.now() + self.expiry_time,
+            'created_at': now,
+            'expires_at': now + self.expiry_time,
+            'expires_at_ts': expires_at_ts,  # Epoch seconds, cheaper to compare than datetimes
             'total_attempts': 0,
             'average_score': 0
         }
+        heapq.heappush(self._expiry_heap, (expires_at_ts, quiz_code))
         
         return quiz_code
     
     def get_quiz(self, quiz_code: str) -> Optional[Dict]:
         """Get quiz by code"""
         quiz = self.quizzes.get(quiz_code)
-        if quiz and datetime.now() < quiz['expires_at']:
+        if quiz and time.time() < quiz['expires_at_ts']:
             return quiz
         return None
     
@@ -68,37 +76,34 @@ class QuizStore:
         if not quiz:
             raise ValueError("Quiz not found")
         
-        submission = {
-            'student_name': student_name,
-            'answers': answers,
-            'timestamp': datetime.now()
-        }
-        
-        if quiz_code not in self.submissions:
-            self.submissions[quiz_code] = []
-        
-        self.submissions[quiz_code].append(submission)
-        quiz['submissions'].append(submission)
-        
         # Calculate score
         questions = quiz['questions']
         if len(answers) != len(questions):
             raise ValueError("Number of answers does not match number of questions")
         
         # Optimize score calculation
-        correct_count = sum(
-            1 for q, a in zip(questions, answers)
-            if a.lower() == q['correct_answer'].lower()
-        )
+        results = [a.lower() == q.get('_ans_lc') for q, a in zip(questions, answers)]
+        correct_count = sum(results)
         
         # Calculate percentage score
         score_percentage = (correct_count / len(questions)) * 100
         
+        # Keep the score with the submission so stats don't have to re-grade it
+        submission = {
+            'student_name': student_name,
+            'answers': answers,
+            'timestamp': datetime.now(),
+            'score': correct_count,
+            'score_percentage': score_percentage
+        }
+        
+        quiz['submissions'].append(submission)
+        
         # Create response object with feedback
         feedback = [
             {
                 'question_num': i + 1,
-                'correct': a.lower() == q['correct_answer'].lower(),
+                'correct': results[i],
                 'student_answer': a,
                 'correct_answer': q['correct_answer']
             }
@@ -127,7 +132,9 @@ class QuizStore:
     
     def get_quiz_responses(self, quiz_code: str) -> List[Dict]:
         """Get all responses for a quiz"""
-        return self.submissions.get(quiz_code, [])
+        # Submissions live on the quiz itself, which may since have expired
+        quiz = self.quizzes.get(quiz_code) or self.expired_quizzes.get(quiz_code, {})
+        return quiz.get('submissions', [])
     
     def get_quiz_stats(self, quiz_code: str) -> Optional[Dict]:
         """Get statistics for a quiz"""
@@ -135,7 +142,7 @@ class QuizStore:
         if not quiz:
             return None
         
-        submissions = self.submissions.get(quiz_code, [])
+        submissions = quiz['submissions']
         total_submissions = len(submissions)
         
         if total_submissions == 0:
@@ -147,26 +154,19 @@ class QuizStore:
                 'submissions': []
             }
         
-        # Calculate scores for each submission
-        detailed_submissions = []
-        scores = []
-        
-        for submission in submissions:
-            correct_answers = 0
-            for q_idx, (question, answer) in enumerate(zip(quiz['questions'], submission['answers'])):
-                if answer.lower() == question['correct_answer'].lower():
-                    correct_answers += 1
-            
-            score_percentage = (correct_answers / len(quiz['questions'])) * 100
-            scores.append(score_percentage)
-            
-            detailed_submissions.append({
+        # Scores were computed when each submission was made
+        total_questions = len(quiz['questions'])
+        scores = [submission['score_percentage'] for submission in submissions]
+        detailed_submissions = [
+            {
                 'student_name': submission['student_name'],
-                'score': correct_answers,
-                'total': len(quiz['questions']),
-                'percentage': round(score_percentage, 1),
+                'score': submission['score'],
+                'total': total_questions,
+                'percentage': round(submission['score_percentage'], 1),
                 'timestamp': submission['timestamp']
-            })
+            }
+            for submission in submissions
+        ]
         
         return {
             'total_attempts': total_submissions,
@@ -178,15 +178,14 @@ class QuizStore:
     
     def cleanup_expired_quizzes(self):
         """Remove expired quizzes and their responses"""
-        current_time = datetime.now()
-        expired_codes = [
-            code for code, quiz in self.quizzes.items()
-            if current_time >= quiz['expires_at']
-        ]
-        
-        for code in expired_codes:
-            self.quizzes.pop(code, None)
-            self.submissions.pop(code, None)
-            self.expired_quizzes[code] = self.quizzes.get(code)
+        current_time = time.time()
+        heap = self._expiry_heap
+        
+        # Only the quizzes that have actually expired are visited
+        while heap and heap[0][0] <= current_time:
+            _, code = heapq.heappop(heap)
+            quiz = self.quizzes.pop(code, None)
+            if quiz is not None:
+                self.expired_quizzes[code] = quiz
         
         self._last_cleanup = time.time() 
\ No newline at end of file
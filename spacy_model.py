@@ -0,0 +1,11 @@
+# spacy_model.py
+
+import functools
+
+import spacy
+
+# One English pipeline per process, loaded on first use. Callers that only need
+# tags pass disable=['parser'] to nlp.pipe instead of loading a second copy.
+@functools.lru_cache(maxsize=1)
+def get_nlp():
+    return spacy.load('en_core_web_sm', disable=['ner', 'lemmatizer'])
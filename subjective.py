@@ -1,35 +1,38 @@
-from transformers import pipeline
+from hf_pipelines import using_pipeline
 import nltk
-from nltk.tokenize import sent_tokenize
 from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize
 import random
+from text_utils import fast_sent_tokenize
+
+_QUESTION_PROMPT = "Generate a thought-provoking question about this text: {}"
+# The same flan-t5 copy ObjectiveTest generates its questions with
+_GENERATOR_PIPELINE = ("text2text-generation", "google/flan-t5-base")
+
+def _reservoir_sample(items, k):
+    """Draw k items uniformly from an iterable of unknown length in one pass (Algorithm R)"""
+    reservoir = []
+    for i, item in enumerate(items):
+        if i < k:
+            reservoir.append(item)
+        else:
+            j = random.randint(0, i)
+            if j < k:
+                reservoir[j] = item
+    return reservoir
 
 class SubjectiveTest:
     def __init__(self, text, num_questions):
         self.text = text
         self.num_questions = num_questions
-        self.generator = pipeline("text2text-generation", model="google/flan-t5-base")
         
     def preprocess_text(self):
         """Preprocess the text to get meaningful paragraphs"""
         # Split text into sentences
-        sentences = sent_tokenize(self.text)
-        
-        # Group sentences into paragraphs (3-4 sentences each)
-        paragraphs = []
-        current_para = []
-        
-        for sent in sentences:
-            current_para.append(sent)
-            if len(current_para) >= 3:
-                paragraphs.append(' '.join(current_para))
-                current_para = []
+        sentences = fast_sent_tokenize(self.text)
         
-        if current_para:  # Add remaining sentences
-            paragraphs.append(' '.join(current_para))
-            
-        return paragraphs
+        # Group sentences into paragraphs of 3, the last one takes any remainder
+        return (' '.join(sentences[i:i + 3]) for i in range(0, len(sentences), 3))
 
     def generate_question_types(self):
         """Generate different types of question starters"""
@@ -49,21 +52,23 @@ class SubjectiveTest:
     def generate_test(self):
         """Generate subjective questions with sample answers"""
         try:
-            paragraphs = self.preprocess_text()
-            if len(paragraphs) < self.num_questions:
+            # Select random paragraphs for question generation while they are grouped
+            selected_paragraphs = _reservoir_sample(self.preprocess_text(), self.num_questions)
+            if len(selected_paragraphs) < self.num_questions:
                 raise ValueError("Not enough content to generate requested number of questions")
-
-            # Select random paragraphs for question generation
-            selected_paragraphs = random.sample(paragraphs, self.num_questions)
+            random.shuffle(selected_paragraphs)
             question_types = self.generate_question_types()
             
             questions = []
             answers = []
             
-            for context in selected_paragraphs:
-                # Generate question using text2text model
-                prompt = f"Generate a thought-provoking question about this text: {context}"
-                question = self.generator(prompt, max_length=50, num_return_sequences=1)[0]['generated_text']
+            # Generate all questions in batched forward passes of the text2text model
+            prompts = [_QUESTION_PROMPT.format(context) for context in selected_paragraphs]
+            with using_pipeline(*_GENERATOR_PIPELINE) as generator:
+                results = generator(prompts, max_length=50, batch_size=8, num_return_sequences=1)
+            
+            for context, result in zip(selected_paragraphs, results):
+                question = (result[0] if isinstance(result, list) else result)['generated_text']
                 
                 # Transform into an analytical/subjective question
                 question_type = random.choice(question_types)
@@ -0,0 +1,11 @@
+# text_utils.py
+
+import re
+
+# Sentence boundary: terminal punctuation, whitespace, then a capital or opening quote
+_SENT_SPLIT = re.compile(r'(?<=[.!?])\s+(?=[A-Z"\'])')
+
+def fast_sent_tokenize(text):
+    """Split cleaned document text into sentences with a single compiled regex"""
+    text = text.strip()
+    return _SENT_SPLIT.split(text) if text else []